@@ -1,6 +1,15 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
-from logic import create_matches, get_play_stats_snapshot
+from logic import create_matches, get_play_stats_snapshot, ScheduleCancelled
+
+# Upper bound on schedule generations running at once across all sessions
+MAX_GENERATION_WORKERS = 4
+# Upper bound on generations running or queued across all sessions; later requests are refused
+MAX_PENDING_GENERATIONS = 16
 
 # Page Config
 st.set_page_config(
@@ -78,6 +87,17 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_generation_executor():
+    # Shared by every session so many clubs generating at once cannot exhaust the server
+    return ThreadPoolExecutor(max_workers=MAX_GENERATION_WORKERS, thread_name_prefix="schedule")
+
+@st.cache_resource
+def get_generation_slots():
+    # Released when a job finishes or is cancelled, so jobs left behind by closed or reloaded
+    # tabs still count until they complete and cannot pile up in the executor queue
+    return threading.BoundedSemaphore(MAX_PENDING_GENERATIONS)
+
 # Session State Initialization
 if 'matches' not in st.session_state:
     st.session_state.matches = []
@@ -85,28 +105,72 @@ if 'current_match_index' not in st.session_state:
     st.session_state.current_match_index = 0
 if 'form_submitted' not in st.session_state:
     st.session_state.form_submitted = False
+if 'generation_job' not in st.session_state:
+    st.session_state.generation_job = None
+
+def cancel_generation():
+    job = st.session_state.generation_job
+    if job is not None:
+        job['cancel_event'].set()
+        job['future'].cancel()
+        st.session_state.generation_job = None
 
 def clear_schedule():
+    cancel_generation()
     st.session_state.matches = []
     st.session_state.form_submitted = False
     st.session_state.current_match_index = 0
 
 def generate_schedule():
+    # Ignore re-clicks while a generation for this session is still running
+    if st.session_state.generation_job is not None:
+        return
+
+    slots = get_generation_slots()
+    if not slots.acquire(blocking=False):
+        st.error('現在混み合っています。しばらくしてから再度お試しください。')
+        return
+
+    match_count = st.session_state.match_count
+    progress = [0, match_count]
+    cancel_event = threading.Event()
+
+    def on_progress(done, total):
+        progress[0] = done
+        progress[1] = total
+
+    future = get_generation_executor().submit(
+        create_matches,
+        st.session_state.male_count, 
+        st.session_state.female_count, 
+        match_count,
+        st.session_state.get('mode', 'balanced'),
+        st.session_state.get('late_male_count', 0),
+        st.session_state.get('late_female_count', 0),
+        st.session_state.get('late_start_match', 1),
+        progress_callback=on_progress,
+        cancel_event=cancel_event
+    )
+    future.add_done_callback(lambda _: slots.release())
+    st.session_state.generation_job = {
+        'future': future,
+        'cancel_event': cancel_event,
+        'progress': progress
+    }
+
+def collect_generation_result():
+    job = st.session_state.generation_job
+    st.session_state.generation_job = None
     try:
-        matches = create_matches(
-            st.session_state.male_count, 
-            st.session_state.female_count, 
-            st.session_state.match_count,
-            st.session_state.get('mode', 'balanced'),
-            st.session_state.get('late_male_count', 0),
-            st.session_state.get('late_female_count', 0),
-            st.session_state.get('late_start_match', 1)
-        )
-        st.session_state.matches = matches
-        st.session_state.current_match_index = 0
-        st.session_state.form_submitted = True
+        matches = job['future'].result()
+    except ScheduleCancelled:
+        return
     except ValueError as e:
         st.error(str(e))
+        return
+    st.session_state.matches = matches
+    st.session_state.current_match_index = 0
+    st.session_state.form_submitted = True
 
 def prev_match():
     if st.session_state.current_match_index > 0:
@@ -159,6 +223,18 @@ with st.container():
             st.number_input("何試合目から？", min_value=1, value=1, key="late_start_match", on_change=clear_schedule)
 
     st.button("🔀 試合順を作成", on_click=generate_schedule)
+
+    # Generation runs on the shared pool; poll it here so the page keeps showing progress.
+    # Changing any input interrupts this loop and cancels the job through clear_schedule.
+    if st.session_state.generation_job is not None:
+        job = st.session_state.generation_job
+        progress_bar = st.progress(0.0, text="試合順を作成中...")
+        while not job['future'].done():
+            done, total = job['progress']
+            progress_bar.progress(min(done / total, 1.0) if total else 0.0, text=f"試合順を作成中... ({done}/{total}試合)")
+            time.sleep(0.1)
+        progress_bar.empty()
+        collect_generation_result()
     st.markdown("</div>", unsafe_allow_html=True)
 
 # Match Display
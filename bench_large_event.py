@@ -0,0 +1,50 @@
+"""
+Scaling benchmark for large-event mode.
+
+Streams balanced schedules through iter_balanced_matches and reports time and
+peak traced memory for a grid of player / match counts.
+
+Usage:
+    python bench_large_event.py
+"""
+import argparse
+import time
+import tracemalloc
+
+from logic import iter_balanced_matches
+
+DEFAULT_PLAYERS = [1000, 5000, 20000]
+DEFAULT_MATCHES = [1000, 10000, 50000]
+
+
+def run_case(players, matches, measure_memory):
+    if measure_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for _ in iter_balanced_matches(players, players, matches, large_event=True, memory_budget_mb=4096):
+        pass
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if measure_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大規模イベントモードのスケーリング計測")
+    parser.add_argument("--players", type=int, nargs="+", default=DEFAULT_PLAYERS, help="男女それぞれの人数")
+    parser.add_argument("--matches", type=int, nargs="+", default=DEFAULT_MATCHES, help="試合数")
+    args = parser.parse_args()
+
+    print(f"{'players':>9} {'matches':>9} {'time [s]':>10} {'us/match':>10} {'peak [MB]':>10}")
+    for players in args.players:
+        for matches in args.matches:
+            # Time and memory are measured in separate runs; tracemalloc slows the loop down
+            elapsed, _ = run_case(players, matches, measure_memory=False)
+            _, peak = run_case(players, matches, measure_memory=True)
+            print(f"{players:>9} {matches:>9} {elapsed:>10.2f} {elapsed / matches * 1e6:>10.1f} {peak / 1024 / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Local load generator for server.py.
+
+Creates one schedule, then keeps `--concurrency` keep-alive connections busy with
+paginated match and stats requests (plus schedule creation when --create is given),
+and reports requests per second and p50/p99 latency.
+
+Usage:
+    python server.py &
+    python loadtest.py --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import time
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def send_request(reader, writer, host, method, path, body=None):
+    """
+    Send one request on an open keep-alive connection and return (status, body).
+    """
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    head = (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        "\r\n"
+    )
+    writer.write(head.encode("latin-1") + payload)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    data = await reader.readexactly(length) if length else b""
+    return status, data
+
+
+def build_requests(schedule_id, settings, match_count, per_page, create):
+    """
+    The request mix cycled through by every worker.
+    """
+    pages = max((match_count + per_page - 1) // per_page, 1)
+    requests = [
+        ("GET", f"/schedules/{schedule_id}?page={page}&per_page={per_page}", None)
+        for page in range(1, pages + 1)
+    ]
+    requests += [
+        ("GET", f"/schedules/{schedule_id}/stats?match_index={idx}", None)
+        for idx in range(0, match_count, max(match_count // 10, 1))
+    ]
+    if create:
+        requests.append(("POST", "/schedules", settings))
+    return requests
+
+
+def unique_settings(settings, request_number):
+    """
+    Give each POST distinct settings so the server's schedule cache never answers it.
+    late_start_match has no effect without late joiners, so every request does the same work.
+    """
+    return dict(settings, late_male_count=0, late_female_count=0, late_start_match=request_number + 1)
+
+
+async def worker(host, port, requests, offset, counter, total, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        i = offset
+        while counter[0] < total:
+            counter[0] += 1
+            method, path, body = requests[i % len(requests)]
+            i += 1
+            if method == "POST":
+                body = unique_settings(body, counter[0])
+            start = time.perf_counter()
+            try:
+                status, _ = await send_request(reader, writer, host, method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors.append("connection")
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    settings = {
+        "male_count": args.males,
+        "female_count": args.females,
+        "match_count": args.matches,
+        "mode": args.mode,
+    }
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    status, data = await send_request(reader, writer, args.host, "POST", "/schedules", settings)
+    writer.close()
+    if status != 201:
+        raise SystemExit(f"schedule creation failed ({status}): {data.decode('utf-8')}")
+    schedule_id = json.loads(data)["schedule_id"]
+
+    requests = build_requests(schedule_id, settings, args.matches, args.per_page, args.create)
+    latencies = []
+    errors = []
+    counter = [0]
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        worker(args.host, args.port, requests, n, counter, args.requests, latencies, errors)
+        for n in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"requests:     {len(latencies)} ok, {len(errors)} errors")
+    print(f"concurrency:  {args.concurrency}")
+    print(f"elapsed:      {elapsed:.2f} s")
+    print(f"throughput:   {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency p50:  {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"latency p99:  {percentile(latencies, 99) * 1000:.2f} ms")
+    if latencies:
+        print(f"latency max:  {latencies[-1] * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="server.py 用の負荷テスト")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--requests", type=int, default=2000, help="総リクエスト数")
+    parser.add_argument("--concurrency", type=int, default=20, help="同時接続数")
+    parser.add_argument("--males", type=int, default=12)
+    parser.add_argument("--females", type=int, default=12)
+    parser.add_argument("--matches", type=int, default=100)
+    parser.add_argument("--mode", default="balanced", choices=["balanced", "fixed_pairs", "random"])
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--create", action="store_true", help="スケジュール作成 (POST) もリクエストに含める")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,111 @@
+import heapq
 import math
+from collections import Counter, defaultdict
 
-def create_matches(males_count, females_count, num_matches, mode="balanced", late_males=0, late_females=0, late_match_start=1):
+# Selection priority of late joiners before they arrive
+NOT_ARRIVED_PRIORITY = 1000000
+
+# Default memory budget of large-event mode
+LARGE_EVENT_MEMORY_BUDGET_MB = 256
+
+# Approximate CPython sizes (bytes) used by estimate_large_event_memory
+_PLAYER_STATE_BYTES = 100
+_PAIR_HISTORY_ROW_BYTES = 300
+_PAIR_HISTORY_ENTRY_BYTES = 100
+_LARGE_EVENT_MATCH_BYTES = 1500
+
+
+class MemoryBudgetExceeded(ValueError):
+    """
+    Raised when a large-event schedule is estimated to exceed memory_budget_mb.
+    """
+
+
+class ScheduleCancelled(Exception):
+    """
+    Raised when schedule generation is cancelled via cancel_event.
+    """
+
+
+def _report_progress(match_num, matches_target, progress_callback, cancel_event):
+    """
+    Check for cancellation and report how many matches have been generated.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise ScheduleCancelled()
+    if progress_callback is not None:
+        progress_callback(match_num, matches_target)
+
+
+def create_matches(males_count, females_count, num_matches, mode="balanced", late_males=0, late_females=0, late_match_start=1,
+                   progress_callback=None, cancel_event=None, large_event=False, memory_budget_mb=LARGE_EVENT_MEMORY_BUDGET_MB):
     """
     Generate match schedule based on the number of players and matches.
+    progress_callback: optional callable(done, total) invoked after each match
+    cancel_event: optional threading.Event; generation stops with ScheduleCancelled once it is set
+    large_event: balanced mode only; lifts the 1000 player/match cap (see iter_balanced_matches)
+    memory_budget_mb: memory allowed for a large-event schedule, including the returned list
     """
     if mode == "random":
         # 簡易化のため一旦ランダムモードは途中参加非対応（既存の引数で呼び出し）
-        return create_random_matches(males_count, females_count, num_matches)
+        return create_random_matches(males_count, females_count, num_matches, progress_callback, cancel_event)
     elif mode == "fixed_pairs":
         # 簡易化のため一旦ペア固定モードも途中参加非対応
-        return create_fixed_pair_matches(males_count, females_count, num_matches)
+        return create_fixed_pair_matches(males_count, females_count, num_matches, progress_callback, cancel_event)
         
     # Default Balanced Mode
+    if large_event:
+        # The whole list is returned, so the budget has to cover the output as well
+        required = estimate_large_event_memory(
+            int(males_count) + int(late_males),
+            int(females_count) + int(late_females),
+            int(num_matches),
+            materialize=True
+        )
+        check_memory_budget(required, memory_budget_mb, streaming=False)
+
+    return list(iter_balanced_matches(
+        males_count, females_count, num_matches, late_males, late_females, late_match_start,
+        progress_callback, cancel_event, large_event, memory_budget_mb
+    ))
+
+
+def estimate_large_event_memory(total_males, total_females, num_matches, materialize=True):
+    """
+    Rough upper bound (bytes) of the memory a large-event schedule needs.
+    State grows with players + matches; materialize adds the returned match list.
+    """
+    players = total_males + total_females
+    # Each match adds at most 4 new pairs, stored symmetrically
+    pair_entries = min(8 * num_matches, total_males * total_males + total_females * total_females)
+    required = (
+        players * (_PLAYER_STATE_BYTES + _PAIR_HISTORY_ROW_BYTES) +
+        pair_entries * _PAIR_HISTORY_ENTRY_BYTES
+    )
+    if materialize:
+        required += num_matches * _LARGE_EVENT_MATCH_BYTES
+    return required
+
+
+def check_memory_budget(required, memory_budget_mb, streaming):
+    """
+    Raise MemoryBudgetExceeded when required bytes exceed memory_budget_mb.
+    """
+    if required > memory_budget_mb * 1024 * 1024:
+        required_mb = math.ceil(required / (1024 * 1024))
+        hint = '' if streaming else 'iter_balanced_matches で逐次生成するか、'
+        raise MemoryBudgetExceeded(f'必要メモリ（約{required_mb}MB）が上限（{memory_budget_mb}MB）を超えています。{hint}上限を引き上げてください。')
+
+
+def iter_balanced_matches(males_count, females_count, num_matches, late_males=0, late_females=0, late_match_start=1,
+                          progress_callback=None, cancel_event=None, large_event=False, memory_budget_mb=LARGE_EVENT_MEMORY_BUDGET_MB):
+    """
+    Yield balanced-mode matches one at a time. Inputs are validated immediately.
+    In large-event mode the 1000 player/match cap is lifted: players are kept in priority heaps,
+    pair history is sparse and each match carries 'waiting_count' instead of full waiting lists,
+    so memory stays within memory_budget_mb. Time grows with matches x log(players) instead of
+    players x matches; the selected players are the same as in normal mode.
+    """
     base_males = int(males_count)
     base_females = int(females_count)
     extra_males = int(late_males)
@@ -27,67 +121,72 @@ def create_matches(males_count, females_count, num_matches, mode="balanced", lat
     if matches_target < 1:
         raise ValueError('試合数を1以上で入力してください。')
 
-    if total_males > 1000 or total_females > 1000 or matches_target > 1000:
-       raise ValueError('人数または試合数が大きすぎます。')
+    if large_event:
+        required = estimate_large_event_memory(total_males, total_females, matches_target, materialize=False)
+        check_memory_budget(required, memory_budget_mb, streaming=True)
+    elif total_males > 1000 or total_females > 1000 or matches_target > 1000:
+       raise ValueError('人数または試合数が大きすぎます。大規模イベントモードを使用してください。')
+
+    return _generate_balanced_matches(
+        base_males, base_females, total_males, total_females, matches_target, start_match_idx,
+        progress_callback, cancel_event, large_event
+    )
 
+
+def _generate_balanced_matches(base_males, base_females, total_males, total_females, matches_target, start_match_idx,
+                               progress_callback, cancel_event, large_event):
     # Status tracking
-    male_play_count = [0] * total_males
-    female_play_count = [0] * total_females
-    male_last_played = [-2] * total_males
-    female_last_played = [-2] * total_females
-    
-    # Each player's start match index (0-indexed)
-    male_start_indices = [0] * base_males + [start_match_idx] * extra_males
-    female_start_indices = [0] * base_females + [start_match_idx] * extra_females
+    if large_event:
+        # Heaps of (play_count * 100 - last_played, id, play_count). Adding the shared match_num gives
+        # the balanced priority, so the order is identical, but a player's key only changes when
+        # they play and each match costs O(log n). Nobody has played yet, so the heaps start sorted.
+        male_queue = [(2, i, 0) for i in range(base_males)]
+        female_queue = [(2, i, 0) for i in range(base_females)]
+        if start_match_idx <= 0:
+            male_queue += [(2, i, 0) for i in range(base_males, total_males)]
+            female_queue += [(2, i, 0) for i in range(base_females, total_females)]
+    else:
+        male_play_count = [0] * total_males
+        female_play_count = [0] * total_females
+        male_last_played = [-2] * total_males
+        female_last_played = [-2] * total_females
 
     # Pair history tracking
-    male_pair_history = [[0] * total_males for _ in range(total_males)]
-    female_pair_history = [[0] * total_females for _ in range(total_females)]
-
-    matches = []
+    # Large events only store pairs that actually played together
+    if large_event:
+        male_pair_history = defaultdict(Counter)
+        female_pair_history = defaultdict(Counter)
+    else:
+        male_pair_history = [[0] * total_males for _ in range(total_males)]
+        female_pair_history = [[0] * total_females for _ in range(total_females)]
 
     for match_num in range(matches_target):
+        _report_progress(match_num, matches_target, progress_callback, cancel_event)
+
+        # Late joiners take part from start_match_idx onwards
+        late_arrived = match_num >= start_match_idx
+
         # 1. Select players
-        # Priority: play_count * 100 + (match_num - last_played)
-        # For late joiners who haven't arrived yet, set priority very high
-        
-        available_males = []
-        for i in range(total_males):
-            if match_num < male_start_indices[i]:
-                priority = 1000000 # Joined later
-            else:
-                priority = male_play_count[i] * 100 + (match_num - male_last_played[i])
-            
-            available_males.append({
-                'id': i,
-                'play_count': male_play_count[i],
-                'last_played': male_last_played[i],
-                'priority': priority
-            })
-        
-        available_males.sort(key=lambda x: x['priority'])
-        if available_males[3]['priority'] >= 1000000:
+        if large_event:
+            if match_num == start_match_idx and match_num > 0:
+                for i in range(base_males, total_males):
+                    heapq.heappush(male_queue, (2, i, 0))
+                for i in range(base_females, total_females):
+                    heapq.heappush(female_queue, (2, i, 0))
+            selected_males_indices = take_next_players(male_queue, match_num)
+            selected_females_indices = take_next_players(female_queue, match_num)
+        else:
+            selected_males_indices = select_players(
+                total_males, base_males, late_arrived, match_num, male_play_count, male_last_played
+            )
+            selected_females_indices = select_players(
+                total_females, base_females, late_arrived, match_num, female_play_count, female_last_played
+            )
+
+        if selected_males_indices is None:
              raise ValueError(f'第{match_num + 1}試合時点で参加可能な男性が不足しています（最低4名必要）。')
-        selected_males_indices = [m['id'] for m in available_males[:4]]
-        
-        available_females = []
-        for i in range(total_females):
-            if match_num < female_start_indices[i]:
-                priority = 1000000
-            else:
-                priority = female_play_count[i] * 100 + (match_num - female_last_played[i])
-                
-            available_females.append({
-                'id': i,
-                'play_count': female_play_count[i],
-                'last_played': female_last_played[i],
-                'priority': priority
-            })
-            
-        available_females.sort(key=lambda x: x['priority'])
-        if available_females[3]['priority'] >= 1000000:
+        if selected_females_indices is None:
              raise ValueError(f'第{match_num + 1}試合時点で参加可能な女性が不足しています（最低4名必要）。')
-        selected_females_indices = [f['id'] for f in available_females[:4]]
 
         # 2. Find best team split
         best_teams = find_best_team_split(
@@ -97,14 +196,15 @@ def create_matches(males_count, females_count, num_matches, mode="balanced", lat
             female_pair_history
         )
 
-        # 3. Update stats
-        for idx in selected_males_indices:
-            male_play_count[idx] += 1
-            male_last_played[idx] = match_num
-            
-        for idx in selected_females_indices:
-            female_play_count[idx] += 1
-            female_last_played[idx] = match_num
+        # 3. Update stats (take_next_players already re-queued large-event players)
+        if not large_event:
+            for idx in selected_males_indices:
+                male_play_count[idx] += 1
+                male_last_played[idx] = match_num
+                
+            for idx in selected_females_indices:
+                female_play_count[idx] += 1
+                female_last_played[idx] = match_num
 
         # Update pair history using the best split
         # Team 1 Males
@@ -116,10 +216,6 @@ def create_matches(males_count, females_count, num_matches, mode="balanced", lat
         # Team 2 Females
         update_pair_history(best_teams['team2']['females'], female_pair_history)
 
-        # 4. Determine waiting members
-        waiting_males = [i + 1 for i in range(total_males) if i not in selected_males_indices and match_num >= male_start_indices[i]]
-        waiting_females = [i + 1 for i in range(total_females) if i not in selected_females_indices and match_num >= female_start_indices[i]]
-
         # Convert 0-indexed IDs to 1-indexed for display
         team1_display = {
             'males': [x + 1 for x in best_teams['team1']['males']],
@@ -130,7 +226,25 @@ def create_matches(males_count, females_count, num_matches, mode="balanced", lat
             'females': [x + 1 for x in best_teams['team2']['females']]
         }
 
-        matches.append({
+        # 4. Determine waiting members
+        if large_event:
+            arrived_males = total_males if late_arrived else base_males
+            arrived_females = total_females if late_arrived else base_females
+            yield {
+                'match_number': match_num + 1,
+                'team1': team1_display,
+                'team2': team2_display,
+                'waiting_count': {
+                    'males': arrived_males - 4,
+                    'females': arrived_females - 4
+                }
+            }
+            continue
+
+        waiting_males = [i + 1 for i in range(total_males) if i not in selected_males_indices and (i < base_males or late_arrived)]
+        waiting_females = [i + 1 for i in range(total_females) if i not in selected_females_indices and (i < base_females or late_arrived)]
+
+        yield {
             'match_number': match_num + 1,
             'team1': team1_display,
             'team2': team2_display,
@@ -138,9 +252,40 @@ def create_matches(males_count, females_count, num_matches, mode="balanced", lat
                 'males': waiting_males,
                 'females': waiting_females
             }
-        })
+        }
 
-    return matches
+    _report_progress(matches_target, matches_target, progress_callback, cancel_event)
+
+
+def select_players(total, base, late_arrived, match_num, play_count, last_played):
+    """
+    Pick the 4 players to play next, or None when fewer than 4 have arrived.
+    Priority: play_count * 100 + (match_num - last_played); late joiners who haven't arrived yet come last.
+    """
+    def priority(i):
+        if i >= base and not late_arrived:
+            return NOT_ARRIVED_PRIORITY # Joined later
+        return play_count[i] * 100 + (match_num - last_played[i])
+
+    # nsmallest keeps the tie order of a stable sort without sorting every player
+    selected = heapq.nsmallest(4, range(total), key=priority)
+    if selected[3] >= base and not late_arrived:
+        return None
+    return selected
+
+
+def take_next_players(queue, match_num):
+    """
+    Large-event counterpart of select_players.
+    Pops the 4 players to play next from a (play_count * 100 - last_played, id, play_count) heap and
+    pushes them back as having played in match_num. Returns None when fewer than 4 players have arrived.
+    """
+    if len(queue) < 4:
+        return None
+    selected = [heapq.heappop(queue) for _ in range(4)]
+    for _, idx, play_count in selected:
+        heapq.heappush(queue, ((play_count + 1) * 100 - match_num, idx, play_count + 1))
+    return [idx for _, idx, _ in selected]
 
 
 def has_same_id_collision(team_males, team_females):
@@ -152,7 +297,7 @@ def has_same_id_collision(team_males, team_females):
     return not set(team_males).isdisjoint(set(team_females))
 
 
-def create_random_matches(males_count, females_count, num_matches):
+def create_random_matches(males_count, females_count, num_matches, progress_callback=None, cancel_event=None):
     """
     Generate completely random matches.
     """
@@ -167,6 +312,8 @@ def create_random_matches(males_count, females_count, num_matches):
     all_females = list(range(females))
     
     for match_num in range(num_matches):
+        _report_progress(match_num, num_matches, progress_callback, cancel_event)
+
         team1 = {}
         team2 = {}
         waiting_males = []
@@ -229,10 +376,11 @@ def create_random_matches(males_count, females_count, num_matches):
             }
         })
         
+    _report_progress(num_matches, num_matches, progress_callback, cancel_event)
     return matches
 
 
-def create_fixed_pair_matches(males_count, females_count, num_matches):
+def create_fixed_pair_matches(males_count, females_count, num_matches, progress_callback=None, cancel_event=None):
     """
     Generate matches where pairs are fixed (e.g., M1-M2, M3-M4).
     """
@@ -266,6 +414,8 @@ def create_fixed_pair_matches(males_count, females_count, num_matches):
     matches = []
     
     for match_num in range(matches_target):
+        _report_progress(match_num, matches_target, progress_callback, cancel_event)
+
         # 1. Sort units by play count
         sorted_m_units = sorted(range(len(male_units)), key=lambda k: male_unit_plays[k])
         sorted_f_units = sorted(range(len(female_units)), key=lambda k: female_unit_plays[k])
@@ -327,6 +477,7 @@ def create_fixed_pair_matches(males_count, females_count, num_matches):
             }
         })
         
+    _report_progress(matches_target, matches_target, progress_callback, cancel_event)
     return matches
 
 
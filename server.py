@@ -0,0 +1,429 @@
+"""
+Lightweight JSON HTTP service for the scheduling logic in logic.py.
+
+Endpoints:
+    POST /schedules                      create a schedule (body: JSON settings)
+    GET  /schedules/<id>?page=&per_page= paginated match retrieval
+    GET  /schedules/<id>/stats?match_index=
+                                         play counts up to the given match (0-based)
+
+Usage:
+    python server.py --host 127.0.0.1 --port 8502
+"""
+import argparse
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit, parse_qs
+
+from logic import MemoryBudgetExceeded, create_matches, get_play_stats_snapshot
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADERS = 100
+MAX_SCHEDULES = 256
+MAX_CACHED_RESPONSES = 4096
+# Server-wide memory budgets; least recently used entries are evicted beyond them
+MAX_STORED_SCHEDULE_MB = 512
+MAX_CACHED_RESPONSE_MB = 64
+# Budget for a single large-event schedule, which also bounds each worker's peak memory
+LARGE_EVENT_BUDGET_MB = 128
+# Approximate CPython sizes (bytes) of a stored match and of each waiting-list entry
+STORED_MATCH_BYTES = 1500
+STORED_PLAYER_ID_BYTES = 36
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 200
+
+# Modes whose output depends only on the settings, so identical requests can share a schedule
+DETERMINISTIC_MODES = ("balanced", "fixed_pairs")
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class LRUCache:
+    """
+    Small bounded mapping that evicts the least recently used entry.
+    With max_weight, entries are also evicted until the total weight(value) fits;
+    the newest entry is always kept.
+    """
+    def __init__(self, max_entries, max_weight=None, weight=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weight = weight
+        self.total_weight = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key][0]
+
+    def put(self, key, value):
+        self.pop(key)
+        weight = self.weight(value) if self.weight is not None else 0
+        self._data[key] = (value, weight)
+        self.total_weight += weight
+        while len(self._data) > 1 and (
+            len(self._data) > self.max_entries or
+            (self.max_weight is not None and self.total_weight > self.max_weight)
+        ):
+            _, (_, evicted_weight) = self._data.popitem(last=False)
+            self.total_weight -= evicted_weight
+
+    def pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.total_weight -= entry[1]
+
+    def __len__(self):
+        return len(self._data)
+
+
+def schedule_weight(schedule):
+    """
+    Approximate memory (bytes) held by a stored schedule.
+    """
+    matches = schedule["matches"]
+    waiting_ids = sum(
+        len(match["waiting"]["males"]) + len(match["waiting"]["females"])
+        for match in matches if "waiting" in match
+    )
+    return len(matches) * STORED_MATCH_BYTES + waiting_ids * STORED_PLAYER_ID_BYTES
+
+
+def parse_settings(body):
+    """
+    Validate the POST /schedules body and return create_matches arguments.
+    """
+    try:
+        data = json.loads(body.decode("utf-8")) if body else {}
+    except (UnicodeDecodeError, ValueError):
+        raise HTTPError(400, "リクエストボディが不正なJSONです。")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "リクエストボディはJSONオブジェクトで指定してください。")
+
+    mode = data.get("mode", "balanced")
+    if mode not in ("balanced", "fixed_pairs", "random"):
+        raise HTTPError(400, "modeは balanced / fixed_pairs / random のいずれかを指定してください。")
+
+    settings = (
+        body_int(data, "male_count", 6),
+        body_int(data, "female_count", 6),
+        body_int(data, "match_count", 5),
+        mode,
+        body_int(data, "late_male_count", 0),
+        body_int(data, "late_female_count", 0),
+        body_int(data, "late_start_match", 1),
+    )
+
+    large_event = data.get("large_event", False)
+    if not isinstance(large_event, bool):
+        raise HTTPError(400, "large_eventは true / false で指定してください。")
+    if large_event and mode != "balanced":
+        raise HTTPError(400, "大規模イベントモードは balanced モードでのみ使用できます。")
+
+    # random / fixed_pairs modes do not validate their inputs, so check here for every mode
+    male_count, female_count, match_count = settings[:3]
+    if male_count < 4 or female_count < 4:
+        raise HTTPError(400, "初期メンバーとして男性4名以上、女性4名以上を入力してください。")
+    if match_count < 1:
+        raise HTTPError(400, "試合数を1以上で入力してください。")
+    late_male_count, late_female_count, late_start_match = settings[4:7]
+    if late_male_count < 0 or late_female_count < 0:
+        raise HTTPError(400, "途中参加の人数を0以上で入力してください。")
+    if late_start_match < 1:
+        raise HTTPError(400, "途中参加の開始試合を1以上で入力してください。")
+    # Large events are bounded by create_matches' memory budget instead
+    if not large_event and (male_count > 1000 or female_count > 1000 or match_count > 1000):
+        raise HTTPError(400, "人数または試合数が大きすぎます。")
+    return settings + (large_event,)
+
+
+def body_int(data, name, default):
+    # JSON floats and booleans are rejected rather than truncated to int
+    value = data.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise HTTPError(400, f"{name}は整数で指定してください。")
+    return value
+
+
+def query_int(query, name, default, minimum, maximum=None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise HTTPError(400, f"{name}は整数で指定してください。")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise HTTPError(400, f"{name}の値が範囲外です。")
+    return value
+
+
+class ScheduleService:
+    """
+    Holds generated schedules and serves the JSON API.
+    CPU-heavy generation runs in a process pool so the event loop keeps serving reads.
+    """
+    def __init__(self, executor):
+        self.executor = executor
+        self.schedules = LRUCache(MAX_SCHEDULES, MAX_STORED_SCHEDULE_MB * 1024 * 1024, schedule_weight)
+        self.responses = LRUCache(MAX_CACHED_RESPONSES, MAX_CACHED_RESPONSE_MB * 1024 * 1024, len)
+        # settings -> schedule id (or in-flight task) for deterministic modes
+        self.by_settings = LRUCache(MAX_SCHEDULES)
+
+    async def create_schedule(self, body):
+        settings = parse_settings(body)
+        if settings[3] not in DETERMINISTIC_MODES:
+            return await self._generate(settings)
+
+        cached = self.by_settings.get(settings)
+        if cached is not None:
+            if isinstance(cached, str) and self.schedules.get(cached) is not None:
+                return cached
+            if isinstance(cached, asyncio.Task):
+                # Identical request already generating; share its result
+                return await asyncio.shield(cached)
+
+        task = asyncio.ensure_future(self._generate(settings))
+        self.by_settings.put(settings, task)
+        try:
+            schedule_id = await asyncio.shield(task)
+        except BaseException:
+            self.by_settings.pop(settings)
+            raise
+        self.by_settings.put(settings, schedule_id)
+        return schedule_id
+
+    async def _generate(self, settings):
+        loop = asyncio.get_running_loop()
+        try:
+            matches = await loop.run_in_executor(
+                self.executor,
+                partial(create_matches, *settings[:7], large_event=settings[7], memory_budget_mb=LARGE_EVENT_BUDGET_MB)
+            )
+        except MemoryBudgetExceeded:
+            # The logic message suggests Python-only remedies, which API clients cannot use
+            raise HTTPError(400, "スケジュールが大きすぎます。人数または試合数を減らしてください。")
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        male_count, female_count, _, mode, late_males, late_females, _, _ = settings
+        schedule_id = uuid.uuid4().hex
+        self.schedules.put(schedule_id, {
+            "mode": mode,
+            "total_males": male_count + (late_males if mode == "balanced" else 0),
+            "total_females": female_count + (late_females if mode == "balanced" else 0),
+            "matches": matches,
+        })
+        return schedule_id
+
+    def get_schedule(self, schedule_id):
+        schedule = self.schedules.get(schedule_id)
+        if schedule is None:
+            raise HTTPError(404, "スケジュールが見つかりません。")
+        return schedule
+
+    def summary(self, schedule_id):
+        schedule = self.get_schedule(schedule_id)
+        return {
+            "schedule_id": schedule_id,
+            "mode": schedule["mode"],
+            "total_males": schedule["total_males"],
+            "total_females": schedule["total_females"],
+            "match_count": len(schedule["matches"]),
+        }
+
+    def list_matches(self, schedule_id, query):
+        schedule = self.get_schedule(schedule_id)
+        matches = schedule["matches"]
+        page = query_int(query, "page", 1, 1)
+        per_page = query_int(query, "per_page", DEFAULT_PER_PAGE, 1, MAX_PER_PAGE)
+        start = (page - 1) * per_page
+        return {
+            "schedule_id": schedule_id,
+            "page": page,
+            "per_page": per_page,
+            "total": len(matches),
+            "total_pages": (len(matches) + per_page - 1) // per_page,
+            "matches": matches[start:start + per_page],
+        }
+
+    async def stats(self, schedule_id, query):
+        schedule = self.get_schedule(schedule_id)
+        last_index = len(schedule["matches"]) - 1
+        match_index = query_int(query, "match_index", last_index, 0, last_index)
+        # O(matches); run it off the event loop so large events don't stall other connections
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(
+            None,
+            get_play_stats_snapshot,
+            schedule["matches"],
+            match_index,
+            schedule["total_males"],
+            schedule["total_females"]
+        )
+        return dict(snapshot, schedule_id=schedule_id, match_index=match_index)
+
+    async def dispatch(self, method, target, body):
+        """
+        Route a request and return (status, encoded JSON body).
+        """
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+
+        if parts == ["schedules"]:
+            if method != "POST":
+                raise HTTPError(405, "POSTで送信してください。")
+            schedule_id = await self.create_schedule(body)
+            return 201, encode_json(self.summary(schedule_id))
+
+        if len(parts) in (2, 3) and parts[0] == "schedules":
+            if method != "GET":
+                raise HTTPError(405, "GETで送信してください。")
+            if len(parts) == 3 and parts[2] != "stats":
+                raise HTTPError(404, "エンドポイントが見つかりません。")
+
+            # Schedules never change once generated, so encoded reads are cached as-is
+            cache_key = (url.path, url.query)
+            cached = self.responses.get(cache_key)
+            if cached is not None and self.schedules.get(parts[1]) is not None:
+                return 200, cached
+
+            query = parse_qs(url.query)
+            if len(parts) == 2:
+                payload = self.list_matches(parts[1], query)
+            else:
+                payload = await self.stats(parts[1], query)
+            encoded = encode_json(payload)
+            self.responses.put(cache_key, encoded)
+            return 200, encoded
+
+        raise HTTPError(404, "エンドポイントが見つかりません。")
+
+
+def encode_json(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def build_response(status, body, keep_alive):
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def read_request(reader):
+    """
+    Read one HTTP/1.1 request. Returns None when the client closed the connection.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "不正なリクエストです。")
+
+    headers = {}
+    header_count = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        header_count += 1
+        if header_count > MAX_HEADERS:
+            raise HTTPError(431, "ヘッダーが多すぎます。")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Content-Lengthが不正です。")
+    if length < 0:
+        raise HTTPError(400, "Content-Lengthが不正です。")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "リクエストボディが大きすぎます。")
+    body = await reader.readexactly(length) if length else b""
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method.upper(), target, body, keep_alive
+
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, body, keep_alive = request
+                status, payload = await service.dispatch(method, target, body)
+            except HTTPError as e:
+                status, payload = e.status, encode_json({"error": e.message})
+            except asyncio.IncompleteReadError:
+                break
+            except Exception:
+                status, payload = 500, encode_json({"error": "サーバー内部エラーが発生しました。"})
+
+            writer.write(build_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        service = ScheduleService(executor)
+        server = await asyncio.start_server(
+            lambda r, w: handle_connection(service, r, w), host, port
+        )
+        print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ソフトバレーチーム作成 JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=None, help="生成用プロセス数 (既定: CPU数)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import pytest
+
+from logic import (
+    MemoryBudgetExceeded,
+    create_matches,
+    get_play_stats_snapshot,
+    iter_balanced_matches,
+    select_players,
+    take_next_players,
+)
+
+
+def teams(matches):
+    return [(m['team1'], m['team2']) for m in matches]
+
+
+def waiting_counts(matches):
+    return [(len(m['waiting']['males']), len(m['waiting']['females'])) for m in matches]
+
+
+# select_players / take_next_players
+
+def test_select_players_prefers_fewest_plays_then_shortest_rest():
+    play_count = [1, 0, 0, 1, 0, 0]
+    last_played = [0, -2, -2, 0, -2, -2]
+    # ids 1, 2, 4, 5 have not played; equal priorities keep id order
+    assert select_players(6, 6, True, 1, play_count, last_played) == [1, 2, 4, 5]
+
+
+def test_select_players_waits_for_late_joiners():
+    play_count = [0] * 6
+    last_played = [-2] * 6
+    assert select_players(6, 3, False, 0, play_count, last_played) is None
+    assert select_players(6, 3, True, 0, play_count, last_played) == [0, 1, 2, 3]
+
+
+def test_take_next_players_requeues_selected_players():
+    queue = [(2, i, 0) for i in range(6)]
+    assert take_next_players(queue, 0) == [0, 1, 2, 3]
+    assert take_next_players(queue, 1) == [4, 5, 0, 1]
+    # Key is play_count * 100 - last_played, so it matches the balanced priority minus match_num
+    assert sorted(queue) == [
+        (99, 4, 1),
+        (99, 5, 1),
+        (100, 2, 1),
+        (100, 3, 1),
+        (199, 0, 2),
+        (199, 1, 2),
+    ]
+
+
+def test_take_next_players_needs_four_players():
+    queue = [(2, i, 0) for i in range(3)]
+    assert take_next_players(queue, 0) is None
+
+
+# Large-event mode
+
+@pytest.mark.parametrize("males, females, num_matches, late_males, late_females, late_start", [
+    (4, 4, 20, 0, 0, 1),
+    (6, 5, 40, 0, 0, 1),
+    (13, 9, 120, 3, 2, 5),
+    (9, 12, 60, 2, 0, 1),
+    (40, 30, 300, 5, 5, 20),
+    # Rest gaps beyond 100 matches, where the play count no longer dominates the priority
+    (450, 420, 400, 0, 0, 1),
+    (250, 250, 400, 20, 20, 150),
+])
+def test_large_event_matches_normal_mode(males, females, num_matches, late_males, late_females, late_start):
+    normal = create_matches(males, females, num_matches, 'balanced', late_males, late_females, late_start)
+    large = create_matches(males, females, num_matches, 'balanced', late_males, late_females, late_start,
+                           large_event=True)
+    assert teams(large) == teams(normal)
+    assert [(m['waiting_count']['males'], m['waiting_count']['females']) for m in large] == waiting_counts(normal)
+
+
+def test_large_event_lifts_player_cap():
+    with pytest.raises(ValueError):
+        create_matches(1001, 4, 5)
+    matches = create_matches(1001, 4, 5, large_event=True)
+    assert len(matches) == 5
+
+
+def test_large_event_enforces_memory_budget():
+    with pytest.raises(MemoryBudgetExceeded) as e:
+        create_matches(8, 8, 5000000, large_event=True, memory_budget_mb=1)
+    assert 'iter_balanced_matches' in str(e.value)
+    # Streaming callers get no streaming hint; their budget covers per-player state only
+    with pytest.raises(MemoryBudgetExceeded) as e:
+        iter_balanced_matches(100000, 100000, 10, large_event=True, memory_budget_mb=1)
+    assert 'iter_balanced_matches' not in str(e.value)
+
+
+def test_iter_balanced_matches_validates_eagerly():
+    with pytest.raises(ValueError):
+        iter_balanced_matches(3, 4, 5, large_event=True)
+
+
+def test_play_stats_snapshot_counts_up_to_index():
+    matches = create_matches(6, 6, 3)
+    stats = get_play_stats_snapshot(matches, 1, 6, 6)
+    assert sum(stats['male_counts']) == 8
+    assert sum(stats['female_counts']) == 8
@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+from logic import ScheduleCancelled, create_matches
+
+
+@pytest.mark.parametrize("mode", ["balanced", "fixed_pairs", "random"])
+def test_progress_callback_reports_every_match(mode):
+    seen = []
+    create_matches(6, 6, 5, mode, progress_callback=lambda done, total: seen.append((done, total)))
+    assert seen == [(n, 5) for n in range(6)]
+
+
+@pytest.mark.parametrize("mode", ["balanced", "fixed_pairs", "random"])
+def test_cancel_event_stops_generation(mode):
+    cancel_event = threading.Event()
+    seen = []
+
+    def cancel_after_two(done, total):
+        seen.append(done)
+        if done == 2:
+            cancel_event.set()
+
+    with pytest.raises(ScheduleCancelled):
+        create_matches(6, 6, 5, mode, progress_callback=cancel_after_two, cancel_event=cancel_event)
+    # Generation stops at the next match boundary
+    assert seen == [0, 1, 2]
+
+
+def test_cancel_event_set_before_start():
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(ScheduleCancelled):
+        create_matches(6, 6, 5, cancel_event=cancel_event)
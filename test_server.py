@@ -0,0 +1,258 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import server
+from logic import create_matches
+from server import HTTPError, LRUCache, ScheduleService, parse_settings, read_request, schedule_weight
+
+
+def body(**settings):
+    return json.dumps(settings).encode("utf-8")
+
+
+def parse_request(raw):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_request(reader)
+
+    return asyncio.run(read())
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# parse_settings
+
+def test_parse_settings_defaults():
+    assert parse_settings(b"")[:7] == (6, 6, 5, "balanced", 0, 0, 1)
+
+
+def test_parse_settings_reads_all_fields():
+    settings = parse_settings(body(
+        male_count=8, female_count=7, match_count=12, mode="fixed_pairs",
+        late_male_count=1, late_female_count=2, late_start_match=3
+    ))
+    assert settings[:7] == (8, 7, 12, "fixed_pairs", 1, 2, 3)
+
+
+@pytest.mark.parametrize("value", [8.7, True, "8", None, [8]])
+def test_parse_settings_rejects_non_integers(value):
+    with pytest.raises(HTTPError) as e:
+        parse_settings(body(male_count=value))
+    assert e.value.status == 400
+
+
+@pytest.mark.parametrize("value", ["false", "true", 1, 0, None])
+def test_parse_settings_requires_boolean_large_event(value):
+    with pytest.raises(HTTPError) as e:
+        parse_settings(body(male_count=3000, large_event=value))
+    assert e.value.status == 400
+
+
+def test_parse_settings_large_event_lifts_cap():
+    assert parse_settings(body(male_count=3000, large_event=True))[7] is True
+    with pytest.raises(HTTPError):
+        parse_settings(body(male_count=3000, large_event=False))
+    with pytest.raises(HTTPError):
+        parse_settings(body(mode="random", large_event=True))
+
+
+@pytest.mark.parametrize("raw", [b"{", b"[1, 2]", b"\xff"])
+def test_parse_settings_rejects_bad_json(raw):
+    with pytest.raises(HTTPError) as e:
+        parse_settings(raw)
+    assert e.value.status == 400
+
+
+@pytest.mark.parametrize("settings", [
+    {"mode": "unknown"},
+    {"male_count": 3},
+    {"female_count": 3, "mode": "random"},
+    {"match_count": 0},
+    {"match_count": 1001},
+    {"late_male_count": -3},
+    {"late_female_count": -1, "large_event": True},
+    {"late_start_match": 0},
+])
+def test_parse_settings_rejects_invalid_values(settings):
+    with pytest.raises(HTTPError) as e:
+        parse_settings(body(**settings))
+    assert e.value.status == 400
+
+
+# read_request
+
+def test_read_request_with_body():
+    raw = b"POST /schedules HTTP/1.1\r\nHost: x\r\nContent-Length: 2\r\n\r\n{}"
+    assert parse_request(raw) == ("POST", "/schedules", b"{}", True)
+
+
+def test_read_request_connection_handling():
+    raw = b"GET / HTTP/1.1\r\nConnection: close\r\n\r\n"
+    assert parse_request(raw)[3] is False
+    raw = b"GET / HTTP/1.0\r\n\r\n"
+    assert parse_request(raw)[3] is False
+    raw = b"GET / HTTP/1.0\r\nConnection: keep-alive\r\n\r\n"
+    assert parse_request(raw)[3] is True
+
+
+def test_read_request_returns_none_on_closed_connection():
+    assert parse_request(b"") is None
+
+
+@pytest.mark.parametrize("raw, status", [
+    (b"GARBAGE\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: abc\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: -3\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (server.MAX_BODY_BYTES + 1), 413),
+    (b"GET / HTTP/1.1\r\n" + b"X-Filler: 1\r\n" * (server.MAX_HEADERS + 1) + b"\r\n", 431),
+])
+def test_read_request_rejects_malformed_requests(raw, status):
+    with pytest.raises(HTTPError) as e:
+        parse_request(raw)
+    assert e.value.status == status
+
+
+# LRUCache
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_evicts_by_weight_but_keeps_newest():
+    cache = LRUCache(10, max_weight=10, weight=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("c", "xxxx")
+    assert cache.get("a") is None
+    assert cache.total_weight == 8
+    cache.put("d", "x" * 20)
+    assert len(cache) == 1
+    assert cache.get("d") == "x" * 20
+    cache.pop("d")
+    assert cache.total_weight == 0
+
+
+def test_schedule_weight_counts_waiting_lists():
+    normal = {"matches": create_matches(20, 20, 10)}
+    large = {"matches": create_matches(20, 20, 10, large_event=True)}
+    assert schedule_weight(normal) == schedule_weight(large) + 10 * 32 * server.STORED_PLAYER_ID_BYTES
+
+
+# ScheduleService
+
+@pytest.fixture
+def service():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield ScheduleService(executor)
+
+
+def test_identical_requests_share_in_flight_generation(service, monkeypatch):
+    calls = []
+    release = threading.Event()
+    create_matches = server.create_matches
+
+    def slow_create_matches(*args, **kwargs):
+        calls.append(args)
+        release.wait(5)
+        return create_matches(*args, **kwargs)
+
+    monkeypatch.setattr(server, "create_matches", slow_create_matches)
+
+    async def scenario():
+        first = asyncio.ensure_future(service.create_schedule(body(male_count=8)))
+        second = asyncio.ensure_future(service.create_schedule(body(male_count=8)))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(first, second)
+
+    first_id, second_id = run(scenario())
+    assert first_id == second_id
+    assert len(calls) == 1
+
+
+def test_random_mode_is_not_shared(service):
+    async def scenario():
+        return [await service.create_schedule(body(mode="random")) for _ in range(2)]
+
+    first_id, second_id = run(scenario())
+    assert first_id != second_id
+
+
+def test_dispatch_pagination_and_stats(service):
+    async def scenario():
+        status, created = await service.dispatch("POST", "/schedules", body(match_count=12))
+        schedule_id = json.loads(created)["schedule_id"]
+        page = await service.dispatch("GET", f"/schedules/{schedule_id}?page=3&per_page=5", b"")
+        stats = await service.dispatch("GET", f"/schedules/{schedule_id}/stats?match_index=0", b"")
+        return status, json.loads(page[1]), json.loads(stats[1])
+
+    status, page, stats = run(scenario())
+    assert status == 201
+    assert page["total_pages"] == 3
+    assert [m["match_number"] for m in page["matches"]] == [11, 12]
+    assert sum(stats["male_counts"]) == 4
+    assert sum(stats["female_counts"]) == 4
+
+
+@pytest.mark.parametrize("method, target, status", [
+    ("GET", "/schedules", 405),
+    ("POST", "/schedules/abc", 405),
+    ("GET", "/schedules/abc", 404),
+    ("GET", "/schedules/abc/other", 404),
+    ("GET", "/unknown", 404),
+])
+def test_dispatch_errors(service, method, target, status):
+    with pytest.raises(HTTPError) as e:
+        run(service.dispatch(method, target, b""))
+    assert e.value.status == status
+
+
+def test_stored_schedules_stay_within_budget(service):
+    service.schedules = LRUCache(server.MAX_SCHEDULES, 1024 * 1024, schedule_weight)
+
+    async def scenario():
+        # Distinct late_start_match values give distinct schedules of about 0.5 MB each
+        return [await service.create_schedule(body(match_count=300, late_start_match=n)) for n in range(1, 4)]
+
+    ids = run(scenario())
+    assert service.schedules.total_weight <= 1024 * 1024
+    assert service.schedules.get(ids[-1]) is not None
+    assert service.schedules.get(ids[0]) is None
+
+
+def test_large_event_schedule(service):
+    async def scenario():
+        status, created = await service.dispatch(
+            "POST", "/schedules", body(male_count=1500, female_count=1200, match_count=50, large_event=True)
+        )
+        schedule_id = json.loads(created)["schedule_id"]
+        page = await service.dispatch("GET", f"/schedules/{schedule_id}?per_page=5", b"")
+        return status, json.loads(page[1])
+
+    status, page = run(scenario())
+    assert status == 201
+    assert page["total"] == 50
+    assert page["matches"][0]["waiting_count"] == {"males": 1496, "females": 1196}
+
+
+def test_over_budget_large_event_gets_api_message(service, monkeypatch):
+    monkeypatch.setattr(server, "LARGE_EVENT_BUDGET_MB", 1)
+    with pytest.raises(HTTPError) as e:
+        run(service.create_schedule(body(male_count=2000, female_count=2000, match_count=200000, large_event=True)))
+    assert e.value.status == 400
+    assert "iter_balanced_matches" not in e.value.message